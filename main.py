@@ -12,12 +12,24 @@ $ python3 payroll_system.py
 
 This script is intentionally simple and easy to extend.
 """
-from decimal import Decimal, ROUND_HALF_UP
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+import bisect
 import sqlite3
 import datetime
+import json
 import csv
 import os
 import sys
+import queue
+import threading
+import time
+import zipfile
+
+try:
+    import numpy as np  # optional: vectorised bulk payroll
+except ImportError:
+    np = None
 
 DB_FILE = 'payroll.db'
 
@@ -26,8 +38,52 @@ def to_decimal(x):
     return Decimal(str(x)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
 
 
+def _to_cents(x):
+    # arbitrary input: goes through to_decimal so it rounds half up exactly
+    return int(to_decimal(x) * 100)
+
+
+def _stored_cents(x):
+    # employee columns are stored rounded to two decimals, so x * 100 is
+    # within float noise of an integer and round() recovers it exactly
+    return int(round(x * 100))
+
+
+def _fmt_cents(c):
+    # integer cents -> '1234.50'; exact, since c / 100 is far inside float precision
+    return f'{c / 100:.2f}'
+
+
+def _div_half_even(n, d):
+    q, r = divmod(n, d)
+    if 2 * r > d or (2 * r == d and q % 2):
+        q += 1
+    return q
+
+
+def _div_half_up(n, d):
+    q, r = divmod(n, d)
+    if 2 * r >= d:
+        q += 1
+    return q
+
+
+def _connect(db_file, check_same_thread=True):
+    # larger statement cache so every query string in this module stays prepared
+    conn = sqlite3.connect(db_file, cached_statements=256, check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+    cur = conn.cursor()
+    # WAL + synchronous=NORMAL: commits no longer need a full fsync barrier
+    cur.execute('PRAGMA journal_mode=WAL')
+    cur.execute('PRAGMA synchronous=NORMAL')
+    cur.execute('PRAGMA temp_store=MEMORY')
+    cur.execute('PRAGMA cache_size=-20000')  # ~20 MB
+    return conn
+
+
 def init_db(db_file=DB_FILE):
-    conn = sqlite3.connect(db_file)
+    conn = _connect(db_file)
+    _emp_cache.clear()  # a new connection may reuse a closed one's id()
     cur = conn.cursor()
     cur.execute('''
         CREATE TABLE IF NOT EXISTS employees (
@@ -41,8 +97,49 @@ def init_db(db_file=DB_FILE):
             other_allowances REAL
         )
     ''')
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS payslips (
+    cur.execute(PAYSLIPS_TABLE_SQL.format(name='payslips'))
+    _migrate_payslips_cascade(conn)
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_emp_name ON employees(name COLLATE NOCASE)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_payslips_emp_id ON payslips(emp_id)')
+    _dedupe_payslips(conn)
+    _round_employee_amounts(conn)
+    cur.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_payslips_emp_month ON payslips(emp_id, month)')
+    conn.commit()
+    cur.execute('PRAGMA foreign_keys=ON')
+    return conn
+
+
+_CONN = None
+_CONN_FILE = None
+
+def _db_path(db_file):
+    return db_file if db_file == ':memory:' else os.path.abspath(db_file)
+
+def get_conn(db_file=DB_FILE):
+    """Return the process-wide connection, opening it with init_db on first use.
+
+    Reusing one connection keeps SQLite's per-connection statement cache warm
+    and runs the schema/PRAGMA setup only once. Asking for a different
+    database while one is open raises ValueError; call close_conn() first.
+    """
+    global _CONN, _CONN_FILE
+    if _CONN is None:
+        _CONN = init_db(db_file)
+        _CONN_FILE = _db_path(db_file)
+    elif _db_path(db_file) != _CONN_FILE:
+        raise ValueError(f'get_conn: {_CONN_FILE} is already open, not {db_file}')
+    return _CONN
+
+def close_conn():
+    global _CONN, _CONN_FILE
+    if _CONN is not None:
+        _CONN.close()
+    _CONN = None
+    _CONN_FILE = None
+
+
+PAYSLIPS_TABLE_SQL = '''
+        CREATE TABLE IF NOT EXISTS {name} (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             emp_id INTEGER,
             month TEXT,
@@ -51,68 +148,244 @@ def init_db(db_file=DB_FILE):
             total_deductions REAL,
             net_salary REAL,
             breakdown TEXT,
-            FOREIGN KEY(emp_id) REFERENCES employees(id)
+            FOREIGN KEY(emp_id) REFERENCES employees(id) ON DELETE CASCADE
         )
-    ''')
+    '''
+
+
+def _migrate_payslips_cascade(conn):
+    # Databases created before ON DELETE CASCADE was added keep the old foreign
+    # key; SQLite cannot alter it in place, so copy into a rebuilt table. Must
+    # run before foreign_keys is switched on.
+    cur = conn.cursor()
+    fks = cur.execute('PRAGMA foreign_key_list(payslips)').fetchall()
+    if not fks or fks[0]['on_delete'] == 'CASCADE':
+        return
+    cur.execute('BEGIN')
+    cur.execute(PAYSLIPS_TABLE_SQL.format(name='payslips_new'))
+    cur.execute('INSERT INTO payslips_new SELECT * FROM payslips')
+    cur.execute('DROP TABLE payslips')
+    cur.execute('ALTER TABLE payslips_new RENAME TO payslips')
     conn.commit()
-    return conn
 
 
-def add_employee(conn, emp_code, name, designation, basic, hra_percent=20, da_percent=0, other_allowances=0):
+def _dedupe_payslips(conn):
+    # Databases from before the unique (emp_id, month) index may hold several
+    # payslips for one month; keep the most recently generated one so the
+    # index can be created. Runs once: afterwards the index exists.
+    cur = conn.cursor()
+    if cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_payslips_emp_month'").fetchone():
+        return
+    cur.execute('''DELETE FROM payslips WHERE id IN (
+                       SELECT id FROM (
+                           SELECT id, ROW_NUMBER() OVER (PARTITION BY emp_id, month
+                                                         ORDER BY generated_on DESC, id DESC) AS rn
+                           FROM payslips
+                           WHERE emp_id IS NOT NULL AND month IS NOT NULL
+                       ) WHERE rn > 1
+                   )''')
+    if cur.rowcount > 0:
+        print(f'Removed {cur.rowcount} duplicate payslip(s); kept the latest for each employee and month.')
+    conn.commit()
+
+
+# PRAGMA user_version once employee amounts have been rounded in place
+ROUNDED_AMOUNTS_VERSION = 1
+
+
+def _round_employee_amounts(conn):
+    # Older versions stored hra/da/other (and updated basic) unrounded; round
+    # them to two decimals the same way _employee_params does for new rows.
+    # Runs once per database: afterwards user_version records it.
+    cur = conn.cursor()
+    if cur.execute('PRAGMA user_version').fetchone()[0] >= ROUNDED_AMOUNTS_VERSION:
+        return
+    rows = cur.execute(f"SELECT id, {', '.join(ROUNDED_EMPLOYEE_FIELDS)} FROM employees").fetchall()
+    updates = []
+    for r in rows:
+        rounded = [None if r[k] is None else float(to_decimal(r[k])) for k in ROUNDED_EMPLOYEE_FIELDS]
+        if rounded != [r[k] for k in ROUNDED_EMPLOYEE_FIELDS]:
+            updates.append((*rounded, r['id']))
+    if updates:
+        sets = ', '.join(f'{k} = ?' for k in ROUNDED_EMPLOYEE_FIELDS)
+        cur.executemany(f'UPDATE employees SET {sets} WHERE id = ?', updates)
+    cur.execute(f'PRAGMA user_version = {ROUNDED_AMOUNTS_VERSION}')
+    conn.commit()
+
+
+@contextmanager
+def txn(conn):
+    """Run a group of statements in one transaction: commit on success, roll back on error."""
     cur = conn.cursor()
     try:
-        cur.execute('''INSERT INTO employees (emp_code,name,designation,basic,hra_percent,da_percent,other_allowances)
-                       VALUES (?,?,?,?,?,?,?)''',
-                    (emp_code, name, designation, float(basic), float(hra_percent), float(da_percent), float(other_allowances)))
+        yield cur
         conn.commit()
-        print('Employee added.')
-    except sqlite3.IntegrityError:
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+INSERT_EMPLOYEE_SQL = '''INSERT INTO employees (emp_code,name,designation,basic,hra_percent,da_percent,other_allowances)
+                         VALUES (?,?,?,?,?,?,?)
+                         ON CONFLICT(emp_code) DO NOTHING'''
+
+UPSERT_EMPLOYEE_SQL = '''INSERT INTO employees (emp_code,name,designation,basic,hra_percent,da_percent,other_allowances)
+                         VALUES (?,?,?,?,?,?,?)
+                         ON CONFLICT(emp_code) DO UPDATE SET
+                             name = excluded.name, designation = excluded.designation, basic = excluded.basic,
+                             hra_percent = excluded.hra_percent, da_percent = excluded.da_percent,
+                             other_allowances = excluded.other_allowances'''
+
+
+# Money and percentage columns are stored already rounded to two decimals, so
+# every payroll path (Python, NumPy, SQL) converts them to the same cents.
+ROUNDED_EMPLOYEE_FIELDS = ('basic', 'hra_percent', 'da_percent', 'other_allowances')
+
+
+def _employee_params(emp_code, name, designation, basic, hra_percent=20, da_percent=0, other_allowances=0):
+    return (emp_code, name, designation, float(to_decimal(basic)), float(to_decimal(hra_percent)),
+            float(to_decimal(da_percent)), float(to_decimal(other_allowances)))
+
+
+def add_employee(conn, emp_code, name, designation, basic, hra_percent=20, da_percent=0, other_allowances=0):
+    with txn(conn) as cur:
+        cur.execute(INSERT_EMPLOYEE_SQL + ' RETURNING id',
+                    _employee_params(emp_code, name, designation, basic, hra_percent, da_percent, other_allowances))
+        added = cur.fetchone()
+    if added is None:
         print('Error: emp_code must be unique.')
+    else:
+        print('Employee added.')
+
+def add_employees_bulk(conn, records, update_existing=False):
+    """Insert many employees with one executemany in a single transaction.
+
+    records is an iterable of (emp_code, name, designation, basic[, hra_percent,
+    da_percent, other_allowances]) tuples; it is consumed lazily. Rows whose
+    emp_code already exists are skipped, or overwritten when update_existing
+    is true. Returns the number of distinct employees inserted (or updated).
+    """
+    if not update_existing:
+        # DO NOTHING leaves repeated codes unchanged, so rowcount is already distinct
+        with txn(conn) as cur:
+            cur.executemany(INSERT_EMPLOYEE_SQL, (_employee_params(*r) for r in records))
+            return cur.rowcount
+    # an upsert counts a code repeated in records once per row; count codes instead
+    codes = set()
+    def params():
+        for r in records:
+            codes.add(r[0])
+            yield _employee_params(*r)
+    with txn(conn) as cur:
+        cur.executemany(UPSERT_EMPLOYEE_SQL, params())
+    _emp_cache.clear()
+    return len(codes)
+
+def import_employees_csv(conn, filename, update_existing=False):
+    # expects a header row; hra_percent, da_percent and other_allowances are optional
+    # a bad row raises ValueError and the whole import is rolled back
+    with open(filename, newline='') as f:
+        reader = csv.DictReader(f)
+
+        def records():
+            for r in reader:
+                if any(r.get(k) is None for k in ('emp_code', 'name', 'designation', 'basic')) or not r['emp_code'].strip():
+                    raise ValueError(f'{filename}, line {reader.line_num}: incomplete employee row')
+                try:
+                    amounts = [to_decimal(v.strip()) for v in (r['basic'], r.get('hra_percent') or '20',
+                                                               r.get('da_percent') or '0', r.get('other_allowances') or '0')]
+                except InvalidOperation:
+                    raise ValueError(f'{filename}, line {reader.line_num}: basic, hra_percent, da_percent and '
+                                     'other_allowances must be numbers') from None
+                yield (r['emp_code'].strip(), r['name'].strip(), r['designation'].strip(), *amounts)
+
+        count = add_employees_bulk(conn, records(), update_existing)
+    if update_existing:
+        print(f'Imported or updated {count} employees from {filename}')
+    else:
+        print(f'Imported {count} employees from {filename} (existing emp_codes skipped)')
 
 def update_employee(conn, emp_code, **kwargs):
-    cur = conn.cursor()
     fields = []
     values = []
     for k, v in kwargs.items():
         if v is not None:
             fields.append(f"{k} = ?")
-            values.append(v)
+            values.append(float(to_decimal(v)) if k in ROUNDED_EMPLOYEE_FIELDS else v)
     if not fields:
         print('No updates provided.')
         return
     values.append(emp_code)
     sql = f"UPDATE employees SET {', '.join(fields)} WHERE emp_code = ?"
-    cur.execute(sql, values)
-    conn.commit()
+    with txn(conn) as cur:
+        cur.execute(sql, values)
+    _emp_cache.pop((id(conn), emp_code), None)
     print('Employee updated.')
 
 def delete_employee(conn, emp_code):
-    cur = conn.cursor()
-    cur.execute('DELETE FROM employees WHERE emp_code = ?', (emp_code,))
-    conn.commit()
-    print('Employee deleted (if existed).')
+    # payslips go with the employee via ON DELETE CASCADE
+    with txn(conn) as cur:
+        cur.execute('DELETE FROM employees WHERE emp_code = ? RETURNING id', (emp_code,))
+        deleted = cur.fetchone()
+    _emp_cache.pop((id(conn), emp_code), None)
+    if deleted is None:
+        print('No employee with that code.')
+    else:
+        print('Employee deleted.')
 
-def list_employees(conn):
+def list_employees(conn, page_size=50):
     cur = conn.cursor()
-    cur.execute('SELECT emp_code, name, designation, basic FROM employees ORDER BY name')
-    rows = cur.fetchall()
-    if not rows:
-        print('No employees found.')
-        return
-    print('\nEmployees:')
-    for r in rows:
-        print(f"Code: {r[0]} | Name: {r[1]} | Designation: {r[2]} | Basic: {to_decimal(r[3])}")
+    offset = 0
+    while True:
+        # fetch one extra row to know whether another page follows
+        cur.execute('SELECT emp_code, name, designation, basic FROM employees '
+                    'ORDER BY name COLLATE NOCASE LIMIT ? OFFSET ?', (page_size + 1, offset))
+        shown = 0
+        more = False
+        for r in cur:
+            if shown == page_size:
+                more = True
+                break
+            if shown == 0 and offset == 0:
+                print('\nEmployees:')
+            print(f"Code: {r['emp_code']} | Name: {r['name']} | Designation: {r['designation']} | Basic: {to_decimal(r['basic'])}")
+            shown += 1
+        if shown == 0 and offset == 0:
+            print('No employees found.')
+            return
+        if not more:
+            break
+        offset += page_size
+        if input('-- more (Enter to continue, q to stop) -- ').strip().lower() == 'q':
+            break
     print()
 
+EMPLOYEE_COLUMNS = 'id, emp_code, name, designation, basic, hra_percent, da_percent, other_allowances'
+
+# (id(conn), emp_code) -> (fetched_at, row); entries expire after EMP_CACHE_TTL
+# seconds so edits made through another connection are picked up eventually.
+EMP_CACHE_TTL = 60.0
+_emp_cache = {}
+
 def get_employee_by_code(conn, emp_code):
+    key = (id(conn), emp_code)
+    hit = _emp_cache.get(key)
+    if hit is not None and time.monotonic() - hit[0] < EMP_CACHE_TTL:
+        return hit[1]
     cur = conn.cursor()
-    cur.execute('SELECT id, emp_code, name, designation, basic, hra_percent, da_percent, other_allowances FROM employees WHERE emp_code = ?', (emp_code,))
+    cur.execute(f'SELECT {EMPLOYEE_COLUMNS} FROM employees WHERE emp_code = ?', (emp_code,))
     row = cur.fetchone()
+    if row is None:
+        _emp_cache.pop(key, None)
+    else:
+        _emp_cache[key] = (time.monotonic(), row)
     return row
 
 
 
 PF_PERCENT = Decimal('12.0')  
+PF_PERCENT_BP = int(PF_PERCENT * 100)
+STANDARD_DEDUCTION_C = 50000 * 100
 TAX_SLABS = [
     (Decimal('250000'), Decimal('0.0')),
     (Decimal('500000'), Decimal('0.05')),
@@ -120,113 +393,449 @@ TAX_SLABS = [
     (Decimal('999999999'), Decimal('0.3')),
 ]
 
+# Integer version of the slabs: limits in cents, rates in basis points. The
+# cumulative tax is kept in cents * basis points so it stays exact.
+_SLAB_LIMITS_C = [int(limit * 100) for limit, _ in TAX_SLABS]
+_SLAB_RATES_BP = [int(rate * 10000) for _, rate in TAX_SLABS]
+_SLAB_FLOORS_C = [0] + _SLAB_LIMITS_C[:-1]
+_CUM_TAX_C_BP = [0]
+for _floor, _limit, _rate in zip(_SLAB_FLOORS_C, _SLAB_LIMITS_C, _SLAB_RATES_BP):
+    _CUM_TAX_C_BP.append(_CUM_TAX_C_BP[-1] + (_limit - _floor) * _rate)
+del _floor, _limit, _rate
+
+if np is not None:
+    _SLAB_LIMITS_C_NP = np.array(_SLAB_LIMITS_C, dtype=np.int64)
+    _SLAB_RATES_BP_NP = np.array(_SLAB_RATES_BP, dtype=np.int64)
+    _SLAB_FLOORS_C_NP = np.array(_SLAB_FLOORS_C, dtype=np.int64)
+    _CUM_TAX_C_BP_NP = np.array(_CUM_TAX_C_BP, dtype=np.int64)
+
+def income_tax_annually_cents(taxable_c):
+    if taxable_c <= 0:
+        return 0
+    i = bisect.bisect_left(_SLAB_LIMITS_C, taxable_c)
+    if i == len(_SLAB_LIMITS_C):
+        i -= 1
+        taxable_c = _SLAB_LIMITS_C[i]
+    tax = _CUM_TAX_C_BP[i] + (taxable_c - _SLAB_FLOORS_C[i]) * _SLAB_RATES_BP[i]
+    return _div_half_up(tax, 10000)
+
 def income_tax_annually(taxable_income):
-   
-    tax = Decimal('0')
-    prev_limit = Decimal('0')
-    for limit, rate in TAX_SLABS:
-        slab_amount = min(limit - prev_limit, taxable_income - prev_limit)
-        if slab_amount <= 0:
-            prev_limit = limit
-            continue
-        tax += slab_amount * rate
-        prev_limit = limit
-        if taxable_income <= limit:
-            break
-    return to_decimal(tax)
+    # Decimal front end to income_tax_annually_cents; the income is rounded to
+    # cents first, as everywhere else in payroll
+    return Decimal(income_tax_annually_cents(_to_cents(taxable_income))).scaleb(-2)
 
-def compute_pay(conn, emp_code, month=None):
-    row = get_employee_by_code(conn, emp_code)
-    if not row:
-        raise ValueError('Employee not found')
-    emp_id, code, name, designation, basic, hra_pct, da_pct, other_allow = row
-    basic = to_decimal(basic)
-    hra = (basic * to_decimal(hra_pct) / Decimal('100')).quantize(Decimal('0.01'))
-    da = (basic * to_decimal(da_pct) / Decimal('100')).quantize(Decimal('0.01'))
-    other_allow = to_decimal(other_allow)
-    gross = (basic + hra + da + other_allow).quantize(Decimal('0.01'))
+INSERT_PAYSLIP_SQL = '''INSERT OR REPLACE INTO payslips (emp_id, month, generated_on, gross_salary, total_deductions, net_salary, breakdown)
+                        VALUES (?,?,?,?,?,?,?)'''
 
-    pf = (basic * PF_PERCENT / Decimal('100')).quantize(Decimal('0.01'))
 
-    annual_gross = gross * Decimal('12')
+def _compute_breakdown(row):
+    # all money is integer cents (percentages in basis points); the cents are
+    # formatted once, and those strings feed both the payslip and its JSON
+    basic_c = _stored_cents(row['basic'])
+    hra_c = _div_half_even(basic_c * _stored_cents(row['hra_percent']), 10000)
+    da_c = _div_half_even(basic_c * _stored_cents(row['da_percent']), 10000)
+    other_c = _stored_cents(row['other_allowances'])
+    gross_c = basic_c + hra_c + da_c + other_c
+
+    pf_c = _div_half_even(basic_c * PF_PERCENT_BP, 10000)
+
+    annual_gross_c = gross_c * 12
     
-    standard_deduction = Decimal('50000')
-    taxable_ann = max(Decimal('0'), annual_gross - standard_deduction)
-    annual_tax = income_tax_annually(taxable_ann)
-    monthly_tax = (annual_tax / Decimal('12')).quantize(Decimal('0.01'))
+    taxable_c = max(0, annual_gross_c - STANDARD_DEDUCTION_C)
+    annual_tax_c = income_tax_annually_cents(taxable_c)
+    monthly_tax_c = _div_half_even(annual_tax_c, 12)
+
+    total_deductions_c = pf_c + monthly_tax_c
+    net_c = gross_c - total_deductions_c
 
-    total_deductions = (pf + monthly_tax).quantize(Decimal('0.01'))
-    net = (gross - total_deductions).quantize(Decimal('0.01'))
+    return _breakdown_from_cents(basic_c, hra_c, da_c, other_c, gross_c, pf_c, monthly_tax_c, total_deductions_c, net_c)
 
+
+def _breakdown_from_cents(basic_c, hra_c, da_c, other_c, gross_c, pf_c, monthly_tax_c, total_deductions_c, net_c):
     breakdown = {
-        'basic': str(basic),
-        'hra': str(hra),
-        'da': str(da),
-        'other_allowances': str(other_allow),
-        'gross_salary': str(gross),
-        'pf': str(pf),
-        'tax': str(monthly_tax),
-        'total_deductions': str(total_deductions),
-        'net_salary': str(net)
+        'basic': _fmt_cents(basic_c),
+        'hra': _fmt_cents(hra_c),
+        'da': _fmt_cents(da_c),
+        'other_allowances': _fmt_cents(other_c),
+        'gross_salary': _fmt_cents(gross_c),
+        'pf': _fmt_cents(pf_c),
+        'tax': _fmt_cents(monthly_tax_c),
+        'total_deductions': _fmt_cents(total_deductions_c),
+        'net_salary': _fmt_cents(net_c)
     }
+    return gross_c, total_deductions_c, net_c, breakdown
+
+
+def _np_div_half_even(n, d):
+    q, r = np.divmod(n, d)
+    return q + ((2 * r > d) | ((2 * r == d) & (q % 2 == 1)))
+
+
+def _compute_breakdowns_np(rows):
+    # Vectorised _compute_breakdown over all rows at once. Stored amounts are
+    # already rounded to two decimals, so np.rint(x * 100) gives the same cents
+    # as _stored_cents on the scalar path.
+    n = len(rows)
+    def column(name):
+        values = np.fromiter((r[name] for r in rows), dtype=np.float64, count=n)
+        return np.rint(values * 100).astype(np.int64)
+
+    basic_c = column('basic')
+    hra_c = _np_div_half_even(basic_c * column('hra_percent'), 10000)
+    da_c = _np_div_half_even(basic_c * column('da_percent'), 10000)
+    other_c = column('other_allowances')
+    gross_c = basic_c + hra_c + da_c + other_c
+
+    pf_c = _np_div_half_even(basic_c * PF_PERCENT_BP, 10000)
+
+    taxable_c = np.minimum(np.maximum(gross_c * 12 - STANDARD_DEDUCTION_C, 0), _SLAB_LIMITS_C[-1])
+    i = np.searchsorted(_SLAB_LIMITS_C_NP, taxable_c, side='left')
+    tax = _CUM_TAX_C_BP_NP[i] + (taxable_c - _SLAB_FLOORS_C_NP[i]) * _SLAB_RATES_BP_NP[i]
+    q, r = np.divmod(tax, 10000)
+    annual_tax_c = q + (2 * r >= 10000)
+    monthly_tax_c = _np_div_half_even(annual_tax_c, 12)
+
+    total_deductions_c = pf_c + monthly_tax_c
+    net_c = gross_c - total_deductions_c
+
+    columns = (basic_c, hra_c, da_c, other_c, gross_c, pf_c, monthly_tax_c, total_deductions_c, net_c)
+    return [_breakdown_from_cents(*cents) for cents in zip(*(c.tolist() for c in columns))]
 
-    if month is None:
-        month = datetime.datetime.now().strftime('%Y-%m')
 
-   
+def compute_pay_bulk(conn, emp_codes=None, month=None, vectorized=False):
+    """Compute and store payslips for many employees in one transaction.
+
+    emp_codes=None runs payroll for every employee. Returns the payslip dicts
+    in the same order as emp_codes (or by emp_code for a full run).
+    vectorized=True does the arithmetic with NumPy when it is installed.
+    """
     cur = conn.cursor()
-    cur.execute('''INSERT INTO payslips (emp_id, month, generated_on, gross_salary, total_deductions, net_salary, breakdown)
-                   VALUES (?,?,?,?,?,?,?)''',
-                (emp_id, month, datetime.datetime.now().isoformat(), float(gross), float(total_deductions), float(net), str(breakdown)))
-    conn.commit()
+    if emp_codes is None:
+        cur.execute(f'SELECT {EMPLOYEE_COLUMNS} FROM employees ORDER BY emp_code')
+        rows = cur.fetchall()
+    else:
+        emp_codes = list(emp_codes)
+        if not emp_codes:
+            return []
+        placeholders = ','.join('?' * len(emp_codes))
+        cur.execute(f'SELECT {EMPLOYEE_COLUMNS} FROM employees WHERE emp_code IN ({placeholders})', emp_codes)
+        by_code = {r['emp_code']: r for r in cur.fetchall()}
+        missing = [c for c in emp_codes if c not in by_code]
+        if missing:
+            raise ValueError(f"Employee not found: {', '.join(missing)}")
+        rows = [by_code[c] for c in emp_codes]
+    results = _compute_breakdowns_np(rows) if vectorized and np is not None and rows else None
+    return _store_payslips(conn, rows, month, results=results)
 
-    return {
-        'emp_code': code,
-        'name': name,
-        'designation': designation,
-        'month': month,
-        **breakdown
-    }
+def _store_payslips(conn, rows, month, writer=None, results=None):
+    # one clock read per run: it supplies the default month and every generated_on
+    now = datetime.datetime.now()
+    if month is None:
+        month = now.strftime('%Y-%m')
+    generated_on = now.isoformat()
+
+    payslips = []
+    params = []
+    if results is None:
+        results = map(_compute_breakdown, rows)
+    for row, (gross_c, total_deductions_c, net_c, breakdown) in zip(rows, results):
+        params.append((row['id'], month, generated_on, gross_c / 100, total_deductions_c / 100, net_c / 100, json.dumps(breakdown, separators=(',', ':'))))
+        payslips.append({
+            'emp_code': row['emp_code'],
+            'name': row['name'],
+            'designation': row['designation'],
+            'month': month,
+            **breakdown
+        })
+
+    if writer is not None:
+        for p in params:
+            writer.submit(p)
+    else:
+        with txn(conn) as cur:
+            cur.executemany(INSERT_PAYSLIP_SQL, params)
+
+    return payslips
+
+def compute_pay(conn, emp_code, month=None, writer=None):
+    """Compute and store one employee's payslip.
+
+    With a PayslipWriter the insert is queued to its background thread and
+    the payslip is returned without waiting for the commit.
+    """
+    row = get_employee_by_code(conn, emp_code)
+    if not row:
+        raise ValueError('Employee not found')
+    return _store_payslips(conn, [row], month, writer)[0]
+
+
+class PayslipWriter:
+    """Background thread that inserts queued payslip rows in batches.
+
+    It opens its own connection to db_file (so this needs a file database,
+    not ':memory:') and commits up to batch_size rows at a time, or whatever
+    arrived within flush_interval seconds. If a batch fails, its rows are
+    retried one by one so only the bad rows are lost; those are kept in
+    .failed and the first error is re-raised by flush() or close(). Call
+    flush() before reading payslips back and close() before exiting.
+    """
+
+    def __init__(self, db_file=DB_FILE, batch_size=256, flush_interval=0.05, maxsize=1024):
+        self.db_file = db_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.failed = []  # (params, exception) for rows that could not be saved
+        self._reported = 0
+        # opened here so a bad path fails in the caller, not in the thread
+        self._conn = _connect(db_file, check_same_thread=False)
+        self._conn.execute('PRAGMA foreign_keys=ON')
+        self._q = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._writer_loop, name='payslip-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, params):
+        self._q.put(params)
+
+    def flush(self):
+        self._q.join()
+        self._raise_failures()
+
+    def close(self):
+        self._q.put(None)
+        self._thread.join()
+        self._conn.close()
+        self._raise_failures()
 
+    def _raise_failures(self):
+        if len(self.failed) > self._reported:
+            first = self.failed[self._reported][1]
+            self._reported = len(self.failed)
+            raise first
+
+    def _next_batch(self):
+        item = self._q.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # put the sentinel back so the loop stops after this batch
+                self._q.task_done()
+                self._q.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _write(self, batch):
+        try:
+            with txn(self._conn) as cur:
+                cur.executemany(INSERT_PAYSLIP_SQL, batch)
+            return
+        except Exception:
+            if len(batch) == 1:
+                raise
+        for params in batch:
+            try:
+                with txn(self._conn) as cur:
+                    cur.execute(INSERT_PAYSLIP_SQL, params)
+            except Exception as e:
+                self.failed.append((params, e))
+
+    def _writer_loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                self._q.task_done()
+                break
+            try:
+                self._write(batch)
+            except Exception as e:
+                self.failed.append((batch[0], e))
+            finally:
+                for _ in batch:
+                    self._q.task_done()
+
+
+def _sql_money(col):
+    # integer cents -> '1234.50', matching _fmt_cents(c)
+    return (f"(CASE WHEN {col} < 0 THEN '-' ELSE '' END || (abs({col}) / 100) || '.' "
+            f"|| printf('%02d', abs({col}) % 100))")
+
+
+def _sql_div_half_even(n, d):
+    # SQL form of _div_half_even for non-negative integer n
+    return (f'({n} / {d} + (CASE WHEN 2 * ({n} % {d}) > {d} '
+            f'OR (2 * ({n} % {d}) = {d} AND ({n} / {d}) % 2 = 1) THEN 1 ELSE 0 END))')
+
+
+def _sql_div_half_up(n, d):
+    # SQL form of _div_half_up for non-negative integer n
+    return f'({n} / {d} + (CASE WHEN 2 * ({n} % {d}) >= {d} THEN 1 ELSE 0 END))'
+
+
+def _sql_tax_case(col):
+    # CASE form of income_tax_annually_cents, generated from the integer slab
+    # tables so it follows TAX_SLABS; yields cents * basis points
+    whens = ' '.join(f'WHEN {col} <= {limit} THEN {cum} + ({col} - {floor}) * {rate}'
+                     for floor, limit, rate, cum in zip(_SLAB_FLOORS_C, _SLAB_LIMITS_C, _SLAB_RATES_BP, _CUM_TAX_C_BP))
+    return f'(CASE {whens} ELSE {_CUM_TAX_C_BP[-1]} END)'
+
+
+# Whole-payroll run as one INSERT ... SELECT. Same integer-cents arithmetic as
+# _compute_breakdown, layered so each rounding step is computed once:
+# half-even for percentages/PF/monthly tax, half-up for annual tax. Employee
+# amounts are stored rounded to two decimals, so round(x * 100) gives the same
+# cents as _stored_cents. Amounts are assumed non-negative (SQLite integer division
+# truncates toward zero).
+COMPUTE_ALL_PAYSLIPS_SQL = f'''
+INSERT OR REPLACE INTO payslips (emp_id, month, generated_on, gross_salary, total_deductions, net_salary, breakdown)
+SELECT id, :month, :now, gross_c / 100.0, total_c / 100.0, net_c / 100.0,
+       json_object('basic', {_sql_money('basic_c')}, 'hra', {_sql_money('hra_c')}, 'da', {_sql_money('da_c')},
+                   'other_allowances', {_sql_money('other_c')}, 'gross_salary', {_sql_money('gross_c')},
+                   'pf', {_sql_money('pf_c')}, 'tax', {_sql_money('tax_c')},
+                   'total_deductions', {_sql_money('total_c')}, 'net_salary', {_sql_money('net_c')})
+FROM (
+    SELECT *, pf_c + tax_c AS total_c, gross_c - pf_c - tax_c AS net_c
+    FROM (
+        SELECT *, {_sql_div_half_even('annual_tax_c', 12)} AS tax_c
+        FROM (
+            SELECT *, {_sql_div_half_up('tax_n', 10000)} AS annual_tax_c
+            FROM (
+                SELECT *, {_sql_tax_case('taxable_c')} AS tax_n
+                FROM (
+                    SELECT *, basic_c + hra_c + da_c + other_c AS gross_c,
+                           max(0, (basic_c + hra_c + da_c + other_c) * 12 - {STANDARD_DEDUCTION_C}) AS taxable_c
+                    FROM (
+                        SELECT id, basic_c, other_c,
+                               {_sql_div_half_even('hra_n', 10000)} AS hra_c,
+                               {_sql_div_half_even('da_n', 10000)} AS da_c,
+                               {_sql_div_half_even('pf_n', 10000)} AS pf_c
+                        FROM (
+                            SELECT id, basic_c, other_c,
+                                   basic_c * hra_bp AS hra_n, basic_c * da_bp AS da_n,
+                                   basic_c * {PF_PERCENT_BP} AS pf_n
+                            FROM (
+                                SELECT id,
+                                       CAST(round(basic * 100) AS INTEGER) AS basic_c,
+                                       CAST(round(hra_percent * 100) AS INTEGER) AS hra_bp,
+                                       CAST(round(da_percent * 100) AS INTEGER) AS da_bp,
+                                       CAST(round(other_allowances * 100) AS INTEGER) AS other_c
+                                FROM employees
+                            )
+                        )
+                    )
+                )
+            )
+        )
+    )
+)
+'''
+
+
+def compute_all_payslips(conn, month=None):
+    """Run payroll for every employee inside SQLite with a single statement.
+
+    Produces the same rows as compute_pay_bulk(conn, None, month), without
+    building payslips in Python.
+    Returns the number of payslips written.
+    """
+    now = datetime.datetime.now()
+    if month is None:
+        month = now.strftime('%Y-%m')
+    with txn(conn) as cur:
+        cur.execute(COMPUTE_ALL_PAYSLIPS_SQL, {'month': month, 'now': now.isoformat()})
+        return cur.rowcount
+
+
+_PAYSLIP_TEMPLATE = """--- PAYSLIP ---
+Employee Code: {emp_code}
+Name: {name}
+Designation: {designation}
+Month: {month}
+
+Basic: {basic}
+HRA: {hra}
+DA: {da}
+Other Allowances: {other_allowances}
+Gross Salary: {gross_salary}
+
+Deductions:
+PF: {pf}
+Tax: {tax}
+Total Deductions: {total_deductions}
+
+NET PAY: {net_salary}"""
 
 def generate_payslip_text(p):
-    lines = []
-    lines.append('--- PAYSLIP ---')
-    lines.append(f"Employee Code: {p['emp_code']}")
-    lines.append(f"Name: {p['name']}")
-    lines.append(f"Designation: {p['designation']}")
-    lines.append(f"Month: {p['month']}")
-    lines.append('')
-    lines.append(f"Basic: {p['basic']}")
-    lines.append(f"HRA: {p['hra']}")
-    lines.append(f"DA: {p['da']}")
-    lines.append(f"Other Allowances: {p['other_allowances']}")
-    lines.append(f"Gross Salary: {p['gross_salary']}")
-    lines.append('')
-    lines.append('Deductions:')
-    lines.append(f"PF: {p['pf']}")
-    lines.append(f"Tax: {p['tax']}")
-    lines.append(f"Total Deductions: {p['total_deductions']}")
-    lines.append('')
-    lines.append(f"NET PAY: {p['net_salary']}")
-    return '\n'.join(lines)
+    return _PAYSLIP_TEMPLATE.format_map(p)
+
+def payslip_filename(p):
+    return f"payslip_{p['emp_code']}_{p['month']}.txt"
+
+def save_payslips_bulk(payslips, directory='.'):
+    """Write each payslip to its own text file in directory; returns the paths."""
+    paths = []
+    for p in payslips:
+        path = os.path.join(directory, payslip_filename(p))
+        with open(path, 'w') as f:
+            f.write(generate_payslip_text(p))
+        paths.append(path)
+    return paths
+
+def save_payslips_aggregated(payslips, out=None):
+    """Write all payslips into one text file, separated by form feeds.
+
+    One open/close for the whole run instead of one per payslip. out defaults
+    to payroll_<month>.txt using the first payslip's month.
+    """
+    payslips = list(payslips)
+    if out is None:
+        month = payslips[0]['month'] if payslips else datetime.datetime.now().strftime('%Y-%m')
+        out = f'payroll_{month}.txt'
+    with open(out, 'w') as f:
+        f.write('\n\f\n'.join(generate_payslip_text(p) for p in payslips))
+    return out
+
+def save_payslips_zip(payslips, out='payroll.zip'):
+    # one payslip_<code>_<month>.txt member per payslip, stored uncompressed
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_STORED) as zf:
+        for p in payslips:
+            zf.writestr(payslip_filename(p), generate_payslip_text(p))
+    return out
 
 def export_payslips_csv(conn, filename='payslips_export.csv'):
     cur = conn.cursor()
     cur.execute('SELECT p.id, e.emp_code, e.name, p.month, p.gross_salary, p.total_deductions, p.net_salary, p.generated_on FROM payslips p JOIN employees e ON e.id = p.emp_id ORDER BY p.generated_on')
-    rows = cur.fetchall()
-    if not rows:
+    first = cur.fetchone()
+    if first is None:
         print('No payslips to export.')
         return
+    # stream the remaining rows straight from the cursor instead of fetchall()
     with open(filename, 'w', newline='') as f:
         writer = csv.writer(f)
         writer.writerow(['payslip_id','emp_code','name','month','gross_salary','total_deductions','net_salary','generated_on'])
-        for r in rows:
-            writer.writerow(r)
-    print(f'Exported {len(rows)} payslips to {filename}')
+        writer.writerow(first)
+        writer.writerows(cur)
+    print(f'Exported payslips to {filename}')
 
 
-def main_menu(conn):
+def _flush_writer(writer):
+    if writer is None:
+        return
+    try:
+        writer.flush()
+    except Exception as e:
+        print('Error: a payslip could not be saved:', e)
+
+def main_menu(conn, writer=None):
     while True:
         print('\nPayroll Management System')
         print('1) Add employee')
@@ -235,7 +844,8 @@ def main_menu(conn):
         print('4) List employees')
         print('5) Generate payslip')
         print('6) Export payslips to CSV')
-        print('7) Quit')
+        print('7) Import employees from CSV')
+        print('8) Quit')
         choice = input('Choose an option: ').strip()
         if choice == '1':
             emp_code = input('Employee code: ').strip()
@@ -265,6 +875,7 @@ def main_menu(conn):
             update_employee(conn, code, **kwargs)
         elif choice == '3':
             code = input('Employee code to delete: ').strip()
+            _flush_writer(writer)
             delete_employee(conn, code)
         elif choice == '4':
             list_employees(conn)
@@ -272,12 +883,12 @@ def main_menu(conn):
             code = input('Employee code for payslip: ').strip()
             month = input('Month (YYYY-MM) or leave blank for current: ').strip() or None
             try:
-                payslip = compute_pay(conn, code, month)
+                payslip = compute_pay(conn, code, month, writer)
                 text = generate_payslip_text(payslip)
                 print('\n' + text + '\n')
                 save_file = input('Save payslip to file? (y/N): ').strip().lower()
                 if save_file == 'y':
-                    filename = f"payslip_{code}_{payslip['month']}.txt"
+                    filename = payslip_filename(payslip)
                     with open(filename, 'w') as f:
                         f.write(text)
                     print(f'Saved to {filename}')
@@ -285,18 +896,31 @@ def main_menu(conn):
                 print('Error:', e)
         elif choice == '6':
             fname = input('CSV filename (default payslips_export.csv): ').strip() or 'payslips_export.csv'
+            _flush_writer(writer)
             export_payslips_csv(conn, fname)
         elif choice == '7':
+            fname = input('CSV filename: ').strip()
+            update = input('Update employees that already exist? (y/N): ').strip().lower() == 'y'
+            try:
+                import_employees_csv(conn, fname, update)
+            except (OSError, KeyError, ValueError) as e:
+                print('Error:', e)
+        elif choice == '8':
             print('Goodbye')
             break
         else:
             print('Invalid choice')
 
 if __name__ == '__main__':
-    conn = init_db()
+    conn = get_conn()
+    writer = PayslipWriter(DB_FILE)
     try:
-        main_menu(conn)
+        main_menu(conn, writer)
         
        
     finally:
-        conn.close()
+        try:
+            writer.close()
+        except Exception as e:
+            print('Error: a payslip could not be saved:', e)
+        close_conn()
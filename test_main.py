@@ -0,0 +1,76 @@
+import contextlib
+import io
+import random
+import unittest
+
+import main
+
+
+def _random_employees(count, seed=0):
+    rnd = random.Random(seed)
+    records = []
+    for i in range(count):
+        basic = rnd.choice([0, rnd.randint(0, 500000), rnd.randint(0, 5000000000) / 100, round(rnd.uniform(0, 200000), 3)])
+        hra = rnd.choice([20, 0, 12.5, rnd.randint(0, 10000) / 100, round(rnd.uniform(0, 60), 3)])
+        da = rnd.choice([0, 5, rnd.randint(0, 5000) / 100, round(rnd.uniform(0, 50), 3)])
+        other = rnd.choice([0, rnd.randint(0, 1000000) / 100, round(rnd.uniform(0, 10000), 3)])
+        records.append((f'E{i}', f'name{i}', 'dev', basic, hra, da, other))
+    # top slab cap, zero pay and values that sit on half-cent ties
+    records.append(('BIG', 'big', 'dev', 1e9, 0, 0, 0))
+    records.append(('ZERO', 'zero', 'dev', 0, 0, 0, 0))
+    records.append(('TIE', 'tie', 'dev', 39295.255, 12.125, 0.125, 1000.005))
+    return records
+
+
+class TaxCaseTest(unittest.TestCase):
+
+    def test_sql_tax_case_matches_python(self):
+        conn = main.init_db(':memory:')
+        sql = f"SELECT {main._sql_div_half_up(main._sql_tax_case('?1'), 10000)}"
+        grid = [0, 1]
+        for limit in main._SLAB_LIMITS_C:
+            grid += [limit - 1, limit, limit + 1]
+        grid += [main._SLAB_LIMITS_C[-1] * 10]
+        rnd = random.Random(1)
+        grid += [rnd.randint(0, 2 * 10**11) for _ in range(5000)]
+        for taxable_c in grid:
+            with self.subTest(taxable_c=taxable_c):
+                self.assertEqual(conn.execute(sql, (taxable_c,)).fetchone()[0],
+                                 main.income_tax_annually_cents(taxable_c))
+
+
+class PayrollPathsTest(unittest.TestCase):
+
+    QUERY = ('SELECT emp_id, month, gross_salary, total_deductions, net_salary, breakdown '
+             'FROM payslips ORDER BY emp_id')
+
+    def _db(self, records):
+        conn = main.init_db(':memory:')
+        main.add_employees_bulk(conn, records)
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.update_employee(conn, 'E7', basic=34225.325, hra_percent=7.005)
+        return conn
+
+    def _payslips(self, conn):
+        return [tuple(r) for r in conn.execute(self.QUERY)]
+
+    def test_compute_all_payslips_matches_compute_pay_bulk(self):
+        records = _random_employees(2000)
+        expected = self._db(records)
+        actual = self._db(records)
+        main.compute_pay_bulk(expected, None, '2026-01')
+        self.assertEqual(main.compute_all_payslips(actual, '2026-01'), len(records))
+        self.assertEqual(self._payslips(actual), self._payslips(expected))
+
+    @unittest.skipIf(main.np is None, 'NumPy not installed')
+    def test_vectorized_matches_scalar(self):
+        records = _random_employees(2000, seed=2)
+        expected = self._db(records)
+        actual = self._db(records)
+        scalar = main.compute_pay_bulk(expected, None, '2026-01')
+        self.assertEqual(main.compute_pay_bulk(actual, None, '2026-01', vectorized=True), scalar)
+        self.assertEqual(self._payslips(actual), self._payslips(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()